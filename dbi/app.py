@@ -4,27 +4,33 @@ from .ui.main_window import MainWindow
 from .core.project_io import load_project
 import sys
 
+_ASSET_DIR = Path(__file__).resolve().parent.parent / "assets"
+
+def _open_project(w: MainWindow, path: Path):
+    state, ui = load_project(path)
+    w._apply_loaded_state(state, ui)
+    w.current_project_path = path
+
+def _open_datafile(w: MainWindow, path: Path):
+    w.load_datafile(str(path))
+
+# anything that is not a project is opened as a LAMMPS data file
+_OPENERS = {".bpj": _open_project, ".json": _open_project}
+
 def main():
     app = QtWidgets.QApplication(sys.argv)
     app.setApplicationName("Discrete Breather Init")
     app.setOrganizationName("DBI")
-    app.setWindowIcon(QtGui.QIcon(str(Path(__file__).resolve().parent.parent / "assets" / "dbi_icon.svg")))
+    icon = QtGui.QIcon(str(_ASSET_DIR / "dbi_icon.svg"))
+    app.setWindowIcon(icon)
 
     w = MainWindow()
-    w.setWindowIcon(app.windowIcon())
+    w.setWindowIcon(icon)
 
     if len(sys.argv) > 1:
         maybe_path = Path(sys.argv[1]).resolve()
         if maybe_path.exists():
-            suffix = maybe_path.suffix.lower()
-            if suffix in {".bpj", ".json"}:
-                # open as project
-                state, ui = load_project(maybe_path)
-                w._apply_loaded_state(state, ui)
-                w.current_project_path = maybe_path
-            else:
-                # open as LAMMPS data file
-                w.load_datafile(str(maybe_path))
+            _OPENERS.get(maybe_path.suffix.lower(), _open_datafile)(w, maybe_path)
 
     w.show()
     sys.exit(app.exec())
@@ -15,9 +15,20 @@ PALETTE = [
     (250, 190, 190, 255), # pink
 ]
 
+_QCOLOR_CACHE = tuple(QtGui.QColor(*c) for c in PALETTE)
+
 def next_color(i: int) -> QtGui.QColor:
-    r,g,b,a = PALETTE[i % len(PALETTE)]
-    return QtGui.QColor(r,g,b,a)
+    # shared instance; callers only read it
+    return _QCOLOR_CACHE[i % len(_QCOLOR_CACHE)]
 
 def tuple_to_qcolor(rgba: Tuple[int,int,int,int]) -> QtGui.QColor:
     return QtGui.QColor(*rgba)
+
+def swatch_pixmap(rgba: Tuple[int,int,int,int], size: int = 16) -> QtGui.QPixmap:
+    key = "gswatch_{}_{}_{}_{}_{}".format(size, *rgba)
+    pix = QtGui.QPixmapCache.find(key)
+    if pix is None:
+        pix = QtGui.QPixmap(size, size)
+        pix.fill(tuple_to_qcolor(rgba))
+        QtGui.QPixmapCache.insert(key, pix)
+    return pix
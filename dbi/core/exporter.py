@@ -12,6 +12,19 @@ def _chunk_iter(seq, n):
     for i in range(0, len(seq), n):
         yield seq[i:i+n]
 
+def _amplitude(x: np.ndarray, y: np.ndarray, A: float, beta: float,
+               x0: float, y0: float, apply_loc: bool) -> np.ndarray:
+    """A / cosh(beta * R) about (x0, y0), computed in one float64 buffer."""
+    if not apply_loc:
+        return np.full(x.shape, A)
+    # positions are stored as float32; do the displacement math in float64
+    r = x.astype(np.float64); r -= x0; r *= r
+    t = y.astype(np.float64); t -= y0; t *= t
+    r += t
+    np.sqrt(r, out=r); r *= beta
+    np.cosh(r, out=r)
+    return np.divide(A, r, out=r)
+
 def export_lammps_block(state: ProjectState, out_dir: Path) -> Path:
     out_dir = Path(out_dir); out_dir.mkdir(parents=True, exist_ok=True)
     ts = datetime.now().strftime("%H%M%S")
@@ -22,29 +35,32 @@ def export_lammps_block(state: ProjectState, out_dir: Path) -> Path:
     apply_loc = bool(state.apply_localizing)
 
     ids_all = state.data.ids.astype(int)
-    x_all   = state.data.x; y_all = state.data.y
 
     buckets: Dict[Tuple[str,str,str], List[int]] = {}
     total_selected = 0
 
+    gidx = state.group_indices()
+    none = np.zeros(0, dtype=np.intp)
     for gid, grp in sorted(state.groups.items()):
-        idx = np.nonzero(state.assignment == gid)[0]
-        if idx.size == 0: continue
+        idx = gidx.get(gid)
+        if idx is None: continue
 
         ux, uy, uz = grp.direction
-        dx0 = x_all[idx] - x0; dy0 = y_all[idx] - y0
-        R   = np.sqrt(dx0*dx0 + dy0*dy0)
-        amp = (A / np.cosh(beta * R)) if apply_loc else (A * np.ones_like(R))
-
-        dx = amp * ux; dy = amp * uy; dz = amp * uz
+        amp = _amplitude(state.data.x[idx], state.data.y[idx], A, beta, x0, y0, apply_loc)
 
         sel_ids = ids_all[idx]; total_selected += sel_ids.size
-        for j, atom_id in enumerate(sel_ids):
-            k = (_fmt(dx[j]), _fmt(dy[j]), _fmt(dz[j]))
-            buckets.setdefault(k, []).append(int(atom_id))
-
-    g1_ids = ids_all[np.nonzero(state.assignment == 1)[0]].tolist()
-    g2_ids = ids_all[np.nonzero(state.assignment == 2)[0]].tolist()
+        # many atoms share an amplitude (same shell, or no localizing at all):
+        # format each distinct value once and move its ids over in atom order
+        uniq, inv = np.unique(amp, return_inverse=True)
+        order = np.argsort(inv, kind="stable")
+        sel_ids = sel_ids[order]
+        bounds = np.concatenate(([0], np.cumsum(np.bincount(inv, minlength=uniq.size))))
+        for u, a in enumerate(uniq.tolist()):
+            k = (_fmt(a * ux), _fmt(a * uy), _fmt(a * uz))
+            buckets.setdefault(k, []).extend(sel_ids[bounds[u]:bounds[u+1]].tolist())
+
+    g1_ids = ids_all[gidx.get(1, none)].tolist()
+    g2_ids = ids_all[gidx.get(2, none)].tolist()
 
     with open(out_path, "w", newline="\n") as f:
         f.write("# Generated by Discrete Breather Init (DBI)\n")
@@ -88,7 +104,7 @@ def export_selected_ids(state: ProjectState, out_dir: Path, scope: str = "all",
     ts = datetime.now().strftime("%H%M%S")
     if scope == "active" and active_gid:
         fname = f"DBI_IDs_active_g{active_gid}_{ts}.txt"
-        idx = np.nonzero(state.assignment == active_gid)[0]
+        idx = state.group_indices().get(active_gid, np.zeros(0, dtype=np.intp))
     else:
         fname = f"DBI_IDs_all_selected_{ts}.txt"
         idx = np.nonzero(state.assignment != 0)[0]
@@ -1,6 +1,9 @@
 from __future__ import annotations
 from pathlib import Path
-from typing import List, Optional, Tuple
+import io
+import mmap
+import re
+from typing import List, Tuple
 import numpy as np
 from .model import DataSet, Box
 
@@ -12,50 +15,58 @@ HEADER_KEYS = {
     "atom types", "bond types", "angle types", "dihedral types", "improper types",
     "groups", "fixes"
 }
+# first word of each section keyword, as bytes, to match against the mapped file
+HEADER_KEYS_B = frozenset(k.split()[0].encode() for k in HEADER_KEYS)
+# atom lines start with a digit, so only lines starting with a letter can open a section
+_WORD_LINE_RE = re.compile(rb"\n[ \t]*([A-Za-z]+)")
 
-def _parse_box(lines: List[str]) -> Box:
-    xlo = xhi = ylo = yhi = zlo = zhi = None
-    for raw in lines:
-        s0 = raw.split("#", 1)[0].strip()
-        if not s0: continue
-        toks = s0.split()
-        if len(toks) < 4: continue
-        label = " ".join(toks[-2:]).lower()
+_ATOMS_RE = re.compile(rb"^[ \t]*atoms\b", re.IGNORECASE | re.MULTILINE)
+
+_BOX_RE = re.compile(
+    rb"^[ \t]*([-+0-9.eE]+)[ \t]+([-+0-9.eE]+)[ \t]+([xyz])lo[ \t]+\3hi\b",
+    re.IGNORECASE | re.MULTILINE,
+)
+
+def _parse_box(header: bytes) -> Box:
+    bounds = {}
+    for m in _BOX_RE.finditer(header):
         try:
-            a, b = float(toks[0]), float(toks[1])
+            bounds[m.group(3).lower()] = (float(m.group(1)), float(m.group(2)))
         except ValueError:
             continue
-        if label == "xlo xhi": xlo, xhi = a, b
-        if label == "ylo yhi": ylo, yhi = a, b
-        if label == "zlo zhi": zlo, zhi = a, b
-    if any(v is None for v in (xlo, xhi, ylo, yhi)):
+    if b"x" not in bounds or b"y" not in bounds:
         raise ValueError("Failed to parse x/y box bounds.")
-    if zlo is None or zhi is None:
-        zlo, zhi = 0.0, 0.0
+    (xlo, xhi), (ylo, yhi) = bounds[b"x"], bounds[b"y"]
+    zlo, zhi = bounds.get(b"z", (0.0, 0.0))
     return Box(xlo=xlo, xhi=xhi, ylo=ylo, yhi=yhi, zlo=zlo, zhi=zhi)
 
-def _find_section(lines: List[str], key: str) -> Optional[int]:
-    key = key.lower()
-    for i, raw in enumerate(lines):
-        left = raw.split("#", 1)[0].strip().lower()
-        if left.startswith(key):
-            return i
-    return None
-
-def _iter_atoms_block(lines: List[str], start_idx: int) -> List[str]:
-    out: List[str] = []
-    i = start_idx + 1
-    n = len(lines)
-    while i < n and not lines[i].strip(): i += 1
-    while i < n:
-        s = lines[i].strip()
-        if s:
-            bare = s.split("#", 1)[0].strip().lower()
-            fw = bare.split()[0] if bare else ""
-            if fw in HEADER_KEYS and fw != "atoms":
-                break
-        out.append(lines[i]); i += 1
-    return out
+def _map_file(p: Path):
+    with open(p, "rb") as f:
+        try:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            # empty files and non-seekable streams cannot be mapped
+            return f.read()
+
+def _next_line(buf, pos: int) -> int:
+    nl = buf.find(b"\n", pos)
+    return len(buf) if nl < 0 else nl + 1
+
+def _iter_atoms_block(buf, start: int) -> Tuple[int, int]:
+    n = len(buf)
+    pos = _next_line(buf, start)
+    while pos < n:
+        nxt = _next_line(buf, pos)
+        if buf[pos:nxt].strip():
+            break
+        pos = nxt
+    begin = pos
+    # begin always follows a newline, so searching from begin-1 also sees the first line
+    for m in _WORD_LINE_RE.finditer(buf, begin - 1):
+        fw = m.group(1).lower()
+        if fw in HEADER_KEYS_B and fw != b"atoms":
+            return begin, m.start() + 1
+    return begin, n
 
 def _parse_atom_line(line: str) -> Tuple[int, float, float, float]:
     s = line.split("#", 1)[0].strip()
@@ -69,32 +80,80 @@ def _parse_atom_line(line: str) -> Tuple[int, float, float, float]:
         raise ValueError(f"Parse error in atom line: {line!r}") from e
     return atom_id, x, y, z
 
-def read_lammps_data(path: str | Path) -> DataSet:
-    p = Path(path)
-    lines = p.read_text(encoding="utf-8", errors="ignore").splitlines()
-    box = _parse_box(lines)
-    atoms_idx = _find_section(lines, "Atoms")
-    if atoms_idx is None:
-        raise ValueError("Could not find 'Atoms' section.")
-    block = _iter_atoms_block(lines, atoms_idx)
+_ATOM_DTYPE = np.dtype([("id", np.int64), ("x", float), ("y", float), ("z", float)])
+
+def _load_atom_columns(block: bytes) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    # id is the first column and x/y/z the last three, whatever the atom style.
+    rec = np.loadtxt(io.BytesIO(block), dtype=_ATOM_DTYPE, usecols=(0, -3, -2, -1),
+                     comments="#", ndmin=1)
+    return rec["id"], rec["x"], rec["y"], rec["z"]
 
+def _parse_atom_rows(rows: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
     ids, xs, ys, zs = [], [], [], []
-    for raw in block:
-        s = raw.strip()
-        if not s or s.startswith("#"): continue
+    for raw in rows:
         try:
-            a_id, x, y, z = _parse_atom_line(s)
+            a_id, x, y, z = _parse_atom_line(raw)
         except ValueError:
             continue
         ids.append(a_id); xs.append(x); ys.append(y); zs.append(z)
+    return (np.asarray(ids, dtype=np.int64), np.asarray(xs, dtype=float),
+            np.asarray(ys, dtype=float), np.asarray(zs, dtype=float))
+
+def read_lammps_header(path: str | Path) -> Tuple[Box, int]:
+    """Cheap first pass: box bounds and the byte offset of the Atoms keyword."""
+    buf = _map_file(Path(path))
+    try:
+        return _read_header(buf)
+    finally:
+        if isinstance(buf, mmap.mmap):
+            buf.close()
 
-    if not ids:
+def read_lammps_atoms(path: str | Path, box: Box, atoms_offset: int) -> DataSet:
+    """Parse the Atoms block located by read_lammps_header."""
+    buf = _map_file(Path(path))
+    try:
+        return _read_atoms(buf, box, atoms_offset)
+    finally:
+        if isinstance(buf, mmap.mmap):
+            buf.close()
+
+def read_lammps_data(path: str | Path) -> DataSet:
+    buf = _map_file(Path(path))
+    try:
+        return _read_atoms(buf, *_read_header(buf))
+    finally:
+        if isinstance(buf, mmap.mmap):
+            buf.close()
+
+def _read_header(buf) -> Tuple[Box, int]:
+    m = _ATOMS_RE.search(buf)
+    atoms_off = m.start() if m else None
+    box = _parse_box(buf[:len(buf) if atoms_off is None else atoms_off])
+    if atoms_off is None:
+        raise ValueError("Could not find 'Atoms' section.")
+    return box, atoms_off
+
+def _read_atoms(buf, box: Box, atoms_off: int) -> DataSet:
+    begin, end = _iter_atoms_block(buf, atoms_off)
+    if begin >= end:
         raise ValueError("Found 'Atoms' section but parsed 0 atoms.")
+    block = buf[begin:end]
 
-    ids = np.asarray(ids, dtype=int)
-    xs  = np.asarray(xs, dtype=float)
-    ys  = np.asarray(ys, dtype=float)
-    zs  = np.asarray(zs, dtype=float)
+    try:
+        ids, xs, ys, zs = _load_atom_columns(block)
+    except ValueError:
+        # Malformed rows: fall back to the tolerant per-line parser.
+        lines = block.decode("utf-8", errors="ignore").splitlines()
+        rows = [l for l in lines if l.strip() and not l.lstrip().startswith("#")]
+        ids, xs, ys, zs = _parse_atom_rows(rows)
+
+    if ids.size == 0:
+        raise ValueError("Found 'Atoms' section but parsed 0 atoms.")
 
-    order = np.argsort(ids, kind="mergesort")
-    return DataSet(ids=ids[order], x=xs[order], y=ys[order], z=zs[order], box=box)
+    pos = np.empty((ids.size, 3), dtype=np.float32)
+    pos[:, 0], pos[:, 1], pos[:, 2] = xs, ys, zs
+    # data files usually list atoms in id order already; only sort when they don't
+    if ids.size > 1 and not (ids[1:] > ids[:-1]).all():
+        order = np.argsort(ids, kind="stable")
+        ids, pos = ids[order], pos[order]
+    return DataSet(ids=ids, pos=pos, box=box)
@@ -1,6 +1,8 @@
 from __future__ import annotations
+from collections import deque
 from dataclasses import dataclass, field
 from typing import Dict, Tuple, Optional
+import math
 import numpy as np
 
 @dataclass
@@ -11,18 +13,40 @@ class Box:
 
 @dataclass
 class DataSet:
-    ids: np.ndarray  # int
-    x: np.ndarray    # float
-    y: np.ndarray    # float
-    z: np.ndarray    # float
+    ids: np.ndarray  # int32, or int64 when an id does not fit
+    pos: np.ndarray  # (N, 3) float32, one interleaved x/y/z row per atom
     box: Box
 
+    def __post_init__(self):
+        self.pos = np.ascontiguousarray(self.pos, dtype=np.float32)
+        ids = self.ids
+        if ids.dtype.itemsize > 4 and (ids.size == 0 or (ids.min() >= -2**31 and ids.max() < 2**31)):
+            self.ids = ids.astype(np.int32)
+
+    @property
+    def x(self) -> np.ndarray: return self.pos[:, 0]
+    @property
+    def y(self) -> np.ndarray: return self.pos[:, 1]
+    @property
+    def z(self) -> np.ndarray: return self.pos[:, 2]
+
 @dataclass
 class Group:
     gid: int
     name: str
     color: Tuple[int,int,int,255] = (200,200,200,255)
     direction: Tuple[float,float,float] = (1.0, 0.0, 0.0)
+    count: int = 0  # number of atoms assigned, kept in sync by ProjectState
+    _angle: float = field(default=0.0, init=False, repr=False, compare=False)
+    _angle_src: Optional[tuple] = field(default=None, init=False, repr=False, compare=False)
+
+    @property
+    def angle_deg(self) -> float:
+        """XY angle of direction in degrees; recomputed only when direction is reassigned."""
+        if self._angle_src is not self.direction:
+            self._angle = math.degrees(math.atan2(self.direction[1], self.direction[0]))
+            self._angle_src = self.direction
+        return self._angle
 
 @dataclass
 class BreatherParams:
@@ -31,53 +55,128 @@ class BreatherParams:
     x0: float = 0.0
     y0: float = 0.0
 
+def _compact(values: np.ndarray) -> np.ndarray | int:
+    # a run of identical values is stored as one scalar
+    if values.size and (values == values[0]).all():
+        return int(values[0])
+    return values
+
+def _compact_indices(indices: np.ndarray) -> np.ndarray | slice:
+    # a contiguous run of atoms is stored as a slice
+    if indices.size > 1 and indices[-1] - indices[0] == indices.size - 1 and (np.diff(indices) == 1).all():
+        return slice(int(indices[0]), int(indices[-1]) + 1)
+    return indices
+
 @dataclass
 class Edit:
-    indices: np.ndarray
-    before: np.ndarray
-    after: np.ndarray
+    indices: np.ndarray | slice
+    before: np.ndarray | int
+    after: np.ndarray | int
     description: str
 
+    @classmethod
+    def make(cls, indices: np.ndarray, before: np.ndarray, after: np.ndarray, description: str) -> Edit:
+        """Record only the atoms whose value actually changes."""
+        changed = before != after
+        if not changed.all():
+            indices, before, after = indices[changed], before[changed], after[changed]
+        return cls(indices=_compact_indices(indices), before=_compact(before), after=_compact(after), description=description)
+
 @dataclass
 class ProjectState:
     data: DataSet
     assignment: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int32))
     groups: Dict[int, Group] = field(default_factory=dict)
-    undo_stack: list[Edit] = field(default_factory=list)
-    redo_stack: list[Edit] = field(default_factory=list)
+    undo_stack: deque[Edit] = field(default_factory=deque)
+    redo_stack: deque[Edit] = field(default_factory=deque)
     max_history: int = 100
     breather: BreatherParams = field(default_factory=BreatherParams)
     apply_localizing: bool = True
     preserve_base_selection: bool = True
+    _palette: Optional[np.ndarray] = field(default=None, init=False, repr=False, compare=False)
+    _palette_key: Optional[tuple] = field(default=None, init=False, repr=False, compare=False)
+    _assign_version: int = field(default=0, init=False, repr=False, compare=False)
+    _gidx: Optional[Dict[int, np.ndarray]] = field(default=None, init=False, repr=False, compare=False)
+    _gidx_key: Optional[tuple] = field(default=None, init=False, repr=False, compare=False)
 
     def __post_init__(self):
         if self.assignment.size == 0:
             self.assignment = np.zeros(self.data.ids.shape[0], dtype=np.int32)
+        # bounded history: appending past max_history drops the oldest edit in O(1)
+        self.undo_stack = deque(self.undo_stack, maxlen=self.max_history)
+        self.redo_stack = deque(self.redo_stack, maxlen=self.max_history)
+
+    @property
+    def version(self) -> int:
+        """Bumped on every assignment change."""
+        return self._assign_version
+
+    def set_assignment(self, indices, values):
+        before = self.assignment[indices]
+        if np.may_share_memory(before, self.assignment):  # slices return views
+            before = before.copy()
+        self.assignment[indices] = values
+        self._assign_version += 1
+        self._shift_counts(before, self.assignment[indices])
+
+    def _shift_counts(self, before: np.ndarray, after: np.ndarray):
+        if not self.groups or before.size == 0:
+            return
+        n = max(self.groups) + 1
+        delta = np.bincount(after.ravel(), minlength=n)[:n] - np.bincount(before.ravel(), minlength=n)[:n]
+        for gid, g in self.groups.items():
+            if gid > 0:
+                g.count += int(delta[gid])
 
     def clear_groups(self):
         self.groups.clear()
-        self.assignment[...] = 0
+        self.set_assignment(..., 0)
         self.undo_stack.clear()
         self.redo_stack.clear()
 
     def add_group(self, gid: int, name: str, color=(200,200,200,255)) -> Group:
         g = Group(gid=gid, name=name, color=color)
+        g.count = int(np.count_nonzero(self.assignment == gid)) if gid > 0 else 0
         self.groups[gid] = g
         return g
 
     def remove_group(self, gid: int):
         if gid in self.groups:
-            del self.groups[gid]
-            self.assignment[self.assignment == gid] = 0
-
-    def colors_rgba_for_all(self, rgba_unassigned=(160,160,160,255)) -> np.ndarray:
-        out = np.empty((self.assignment.size, 4), dtype=np.ubyte)
-        for i, gid in enumerate(self.assignment):
-            if gid == 0 or gid not in self.groups:
-                out[i] = rgba_unassigned
-            else:
-                out[i] = np.array(self.groups[gid].color, dtype=np.ubyte)
-        return out
+            g = self.groups.pop(gid)
+            if g.count:
+                self.set_assignment(self.assignment == gid, 0)
+
+    def group_indices(self) -> Dict[int, np.ndarray]:
+        """Ascending atom indices per group id in the assignment, cached per edit; the arrays are shared, do not modify."""
+        a = self.assignment
+        key = (self._assign_version, id(a), a.size)
+        if self._gidx is None or key != self._gidx_key:
+            order = np.argsort(a, kind="stable")
+            gids, starts = np.unique(a[order], return_index=True)
+            ends = np.append(starts[1:], a.size)
+            self._gidx = {g: order[s:e] for g, s, e in zip(gids.tolist(), starts.tolist(), ends.tolist())}
+            self._gidx_key = key
+        return self._gidx
+
+    def color_palette(self, rgba_unassigned) -> np.ndarray:
+        """(max_gid+1, 4) RGBA lookup table indexed by group id."""
+        key = (tuple(rgba_unassigned), tuple((gid, g.color) for gid, g in self.groups.items()))
+        if self._palette is None or key != self._palette_key:
+            gids = np.fromiter(self.groups.keys(), dtype=np.int64, count=len(self.groups))
+            palette = np.tile(np.asarray(rgba_unassigned, dtype=np.ubyte), (int(gids.max(initial=0)) + 1, 1))
+            for gid, g in self.groups.items():
+                if gid > 0:
+                    palette[gid] = g.color
+            self._palette, self._palette_key = palette, key
+        return self._palette
+
+    def palette_rows(self, n_rows: int, idx=slice(None)) -> np.ndarray:
+        """Assignment (of the atoms at idx) as row indices into a palette with n_rows entries."""
+        a = self.assignment[idx]
+        if a.size and (a.min() < 0 or a.max() >= n_rows):
+            # ids of removed groups fall back to the unassigned color
+            a = np.where((a >= 0) & (a < n_rows), a, 0)
+        return a
 
     # --- history ---
     def can_undo(self) -> bool: return len(self.undo_stack) > 0
@@ -86,13 +185,13 @@ class ProjectState:
     def undo(self) -> Optional[Edit]:
         if not self.undo_stack: return None
         e = self.undo_stack.pop()
-        self.assignment[e.indices] = e.before
+        self.set_assignment(e.indices, e.before)
         self.redo_stack.append(e)
         return e
 
     def redo(self) -> Optional[Edit]:
         if not self.redo_stack: return None
         e = self.redo_stack.pop()
-        self.assignment[e.indices] = e.after
+        self.set_assignment(e.indices, e.after)
         self.undo_stack.append(e)
         return e
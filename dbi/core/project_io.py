@@ -3,23 +3,47 @@ from pathlib import Path
 from typing import Dict, Any
 import json
 import numpy as np
+
+try:
+    import orjson
+except ImportError:  # optional, falls back to the stdlib encoder
+    orjson = None
 from .model import ProjectState, DataSet, Box, BreatherParams
 
+def _arrays_path(path: Path) -> Path:
+    # bulk arrays live next to the project file: "name.bpj" -> "name.bpj.npz"
+    return path.with_name(path.name + ".npz")
+
+class _NpEncoder(json.JSONEncoder):
+    # stdlib counterpart of orjson's OPT_SERIALIZE_NUMPY
+    def default(self, o):
+        if isinstance(o, np.ndarray):
+            return o.tolist()
+        if isinstance(o, np.generic):
+            return o.item()
+        return super().default(o)
+
+def _from_list(values: list, dtype) -> np.ndarray:
+    # preallocates from the known length instead of growing like np.asarray on a list
+    return np.fromiter(values, dtype=dtype, count=len(values))
+
 def save_project(state: ProjectState, path: Path, ui_state: Dict[str, Any]) -> None:
     path = Path(path)
+    arrays_path = _arrays_path(path)
+    np.savez_compressed(
+        arrays_path,
+        ids=state.data.ids, x=state.data.x, y=state.data.y, z=state.data.z,
+        assignment=state.assignment,
+    )
     data = {
         "data": {
-            "ids": state.data.ids.tolist(),
-            "x": state.data.x.tolist(),
-            "y": state.data.y.tolist(),
-            "z": state.data.z.tolist(),
+            "arrays": arrays_path.name,
             "box": {
                 "xlo": state.data.box.xlo, "xhi": state.data.box.xhi,
                 "ylo": state.data.box.ylo, "yhi": state.data.box.yhi,
                 "zlo": state.data.box.zlo, "zhi": state.data.box.zhi
             }
         },
-        "assignment": state.assignment.tolist(),
         "groups": [
             {
                 "gid": int(g.gid), "name": g.name, "color": list(g.color),
@@ -34,20 +58,33 @@ def save_project(state: ProjectState, path: Path, ui_state: Dict[str, Any]) -> N
         "preserve_base_selection": state.preserve_base_selection,
         "ui": ui_state,
     }
-    path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    if orjson is not None:
+        path.write_bytes(orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY))
+    else:
+        path.write_text(json.dumps(data, cls=_NpEncoder, separators=(",", ":")), encoding="utf-8")
 
 def load_project(path: Path) -> tuple[ProjectState, Dict[str, Any]]:
-    d = json.loads(Path(path).read_text(encoding="utf-8"))
+    path = Path(path)
+    if orjson is not None:
+        d = orjson.loads(path.read_bytes())
+    else:
+        d = json.loads(path.read_text(encoding="utf-8"))
     box = Box(**d["data"]["box"])
+    if "ids" in d["data"]:
+        # legacy projects keep every array inline in the JSON
+        arrays = {k: _from_list(d["data"][k], np.float32) for k in ("x", "y", "z")}
+        arrays["ids"] = _from_list(d["data"]["ids"], np.int64)
+        arrays["assignment"] = _from_list(d["assignment"], np.int32)
+    else:
+        with np.load(path.with_name(d["data"]["arrays"])) as npz:
+            arrays = {k: npz[k] for k in ("ids", "x", "y", "z", "assignment")}
     ds = DataSet(
-        ids=np.asarray(d["data"]["ids"], dtype=int),
-        x=np.asarray(d["data"]["x"], dtype=float),
-        y=np.asarray(d["data"]["y"], dtype=float),
-        z=np.asarray(d["data"]["z"], dtype=float),
+        ids=np.asarray(arrays["ids"]),
+        pos=np.column_stack((arrays["x"], arrays["y"], arrays["z"])),
         box=box
     )
     st = ProjectState(data=ds)
-    st.assignment = np.asarray(d["assignment"], dtype=np.int32)
+    st.assignment = np.asarray(arrays["assignment"], dtype=np.int32)
     st.groups.clear()
     for g in d["groups"]:
         gid = int(g["gid"])
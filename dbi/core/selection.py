@@ -0,0 +1,124 @@
+from __future__ import annotations
+from typing import Callable, Optional
+import math
+import numpy as np
+
+def stride_keep(idx_sorted: np.ndarray, n: int, offset: int) -> np.ndarray:
+    """Keep 1 of every n entries of an ordered selection, starting at offset (taken mod n)."""
+    n = max(1, int(n))
+    # a strided view: no per-atom modulo mask is built
+    return idx_sorted[int(offset) % n::n]
+
+def _pad(c: float, r: float) -> float:
+    # widens a window so float32 rounding at its edge cannot drop a hit;
+    # callers re-test candidates with the exact expression
+    return r + 1e-6 * (abs(float(c)) + r) + 1e-12
+
+class PointIndex:
+    """Atoms sorted along each axis, so window queries touch only the atoms near the query."""
+
+    def __init__(self, x: np.ndarray, y: np.ndarray):
+        self.coords = (x, y)
+        self._order = [None, None]
+        self._sorted = [None, None]
+        self._rank = [None, None]
+
+    def _axis(self, axis: int):
+        if self._order[axis] is None:
+            c = self.coords[axis]
+            self._order[axis] = np.argsort(c, kind="stable")
+            self._sorted[axis] = c[self._order[axis]]
+        return self._order[axis], self._sorted[axis]
+
+    def rank(self, axis: int) -> np.ndarray:
+        """Position of each atom in axis order (ties by index)."""
+        if self._rank[axis] is None:
+            order, _ = self._axis(axis)
+            rank = np.empty(order.size, dtype=np.int64)
+            rank[order] = np.arange(order.size)
+            self._rank[axis] = rank
+        return self._rank[axis]
+
+    def window(self, axis: int, lo: float, hi: float) -> np.ndarray:
+        """Indices (in axis order) of atoms with lo <= coord <= hi along axis (0 = x, 1 = y)."""
+        order, cs = self._axis(axis)
+        # bounds in the array's dtype: a Python float would make searchsorted
+        # upcast the whole sorted column first
+        t = cs.dtype.type
+        i = cs.searchsorted(t(lo), side="left")
+        j = cs.searchsorted(t(hi), side="right")
+        return order[i:j]
+
+    def strip(self, axis: int, c: float, r: float) -> np.ndarray:
+        """Ascending indices of atoms with |coord - c| <= r, same as np.nonzero on the full mask."""
+        p = _pad(c, r)
+        cand = np.sort(self.window(axis, c - p, c + p))
+        return cand[np.abs(self.coords[axis][cand] - c) <= r]
+
+    def strips(self, axis: int, centers: np.ndarray, r: float) -> tuple[np.ndarray, np.ndarray]:
+        """strip() for many centers in one pass: the hits, and for each hit the position of its center.
+
+        Hits are grouped by center, in axis order within each group.
+        """
+        order, cs = self._axis(axis)
+        c = self.coords[axis]
+        centers = np.asarray(centers, dtype=c.dtype)
+        p = (r + 1e-6 * (np.abs(centers.astype(np.float64)) + r) + 1e-12).astype(c.dtype)  # _pad, vectorized
+        i = cs.searchsorted(centers - p, side="left")
+        lens = cs.searchsorted(centers + p, side="right") - i
+        # flatten the windows order[i:j] into one gather
+        seg = np.repeat(np.arange(centers.size), lens)
+        pos = np.arange(seg.size) - np.repeat(np.cumsum(lens) - lens - i, lens)
+        cand = order[pos]
+        hit = np.abs(c[cand] - centers[seg]) <= r
+        return cand[hit], seg[hit]
+
+    def rect(self, left: float, right: float, bottom: float, top: float) -> np.ndarray:
+        """Ascending indices of atoms inside the closed rectangle, same as np.flatnonzero on the full mask."""
+        # scan whichever axis window holds fewer atoms: a wide, flat band is cheap in y
+        wx = self.window(0, left - _pad(left, 0.0), right + _pad(right, 0.0))
+        wy = self.window(1, bottom - _pad(bottom, 0.0), top + _pad(top, 0.0))
+        cand = np.sort(wx if wx.size <= wy.size else wy)
+        x, y = self.coords[0][cand], self.coords[1][cand]
+        mask = x >= left
+        mask &= x <= right
+        mask &= y >= bottom
+        mask &= y <= top
+        return cand[mask]
+
+    def nearest(self, x: float, y: float, tol2: float) -> Optional[int]:
+        """Closest atom to (x, y) with squared distance <= tol2, lowest index on ties."""
+        p = _pad(x, math.sqrt(tol2))
+        cand = self.window(0, x - p, x + p)
+        if cand.size == 0:
+            return None
+        dx = self.coords[0][cand] - x
+        dy = self.coords[1][cand] - y
+        dist2 = dx * dx + dy * dy
+        best = dist2.min()
+        if not best <= tol2:
+            return None
+        return int(cand[dist2 == best].min())
+
+def rule_hits(index: PointIndex, anchors: np.ndarray, axis: int, r: float, n: int, offset: int,
+              inside: Optional[Callable[[np.ndarray], np.ndarray]] = None) -> np.ndarray:
+    """Sorted union over anchors of every n-th atom (ordered along the other axis) in each anchor's strip.
+
+    inside, if given, maps indices to a bool mask of the atoms allowed to count.
+    """
+    cand, seg = index.strips(axis, index.coords[axis][anchors], r)
+    if inside is not None:
+        m = inside(cand)
+        cand, seg = cand[m], seg[m]
+    # order each strip along the other axis (ties by index) with one sort on a
+    # combined (strip, rank along the other axis) key, then stride per strip
+    rank = index.rank(1 - axis)
+    s = np.argsort(seg * rank.size + rank[cand])
+    cand, seg = cand[s], seg[s]
+    counts = np.bincount(seg, minlength=len(anchors))
+    k = np.arange(cand.size) - (np.cumsum(counts) - counts)[seg]
+    n = max(1, int(n))
+    # union through a per-atom mask: strips overlap, and np.unique would sort every hit
+    out = np.zeros(rank.size, dtype=bool)
+    out[cand[k % n == int(offset) % n]] = True
+    return np.flatnonzero(out)
@@ -26,10 +26,18 @@ class LocalizeDialog(QtWidgets.QDialog):
         self.plot.showGrid(x=True, y=True, alpha=0.2)
         self.plot.setBackground("#0f0f0f")
         self.curve = self.plot.plot([], [], pen=pg.mkPen(200,200,255,200, width=2))
+        # sample grid and output buffer are reused by every redraw
+        self._R = np.linspace(0.0, 10.0, 400)
+        self._y = np.empty_like(self._R)
         self._update_plot()
 
+        # coalesce bursts of spin box changes into one redraw per frame
+        self._redraw_timer = QtCore.QTimer(self)
+        self._redraw_timer.setSingleShot(True)
+        self._redraw_timer.setInterval(16)
+        self._redraw_timer.timeout.connect(self._update_plot)
         for w in (self.A, self.beta, self.x0, self.y0):
-            w.valueChanged.connect(self._update_plot)
+            w.valueChanged.connect(self._redraw_timer.start)
 
         btns = QtWidgets.QDialogButtonBox(
             QtWidgets.QDialogButtonBox.StandardButton.Ok |
@@ -47,9 +55,11 @@ class LocalizeDialog(QtWidgets.QDialog):
 
     def _update_plot(self):
         A = self.A.value(); beta = self.beta.value()
-        R = np.linspace(0.0, 10.0, 400)
-        y = np.where(beta == 0.0, A*np.ones_like(R), A / np.cosh(beta*R))
-        self.curve.setData(R, y)
+        y = self._y
+        np.multiply(self._R, beta, out=y)
+        np.cosh(y, out=y)
+        np.divide(A, y, out=y)
+        self.curve.setData(self._R, y)
 
     def _apply_emit(self):
         self.values_applied.emit(self.A.value(), self.beta.value(), self.x0.value(), self.y0.value())
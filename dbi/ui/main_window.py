@@ -7,15 +7,15 @@ import numpy as np
 from PyQt6 import QtWidgets, QtCore, QtGui
 import pyqtgraph as pg
 
-from ..core.lammps_parser import read_lammps_data
-from ..core.model import DataSet, ProjectState, BreatherParams, Edit
+from ..core.model import Box, DataSet, ProjectState, BreatherParams, Edit
 from ..core.exporter import export_lammps_block, export_selected_ids
-from ..core.color_utils import next_color, tuple_to_qcolor
+from ..core.selection import PointIndex, rule_hits, stride_keep
+from ..core.color_utils import next_color, tuple_to_qcolor, swatch_pixmap
 from ..core.project_io import save_project, load_project
-from .localize_dialog import LocalizeDialog
 
 UNASSIGNED_RGBA = (160,160,160,255)
-pg.setConfigOptions(antialias=True)
+# above this many atoms the scatter drops antialiasing and spot outlines
+LARGE_SCATTER = 50_000
 
 
 def _lighter(c: QtGui.QColor, f: float = 1.25) -> QtGui.QColor:
@@ -24,24 +24,44 @@ def _lighter(c: QtGui.QColor, f: float = 1.25) -> QtGui.QColor:
     return QtGui.QColor.fromHsv(h, s, v, a)
 
 
-def _make_shaded_brush(base: Tuple[int, int, int, int]) -> QtGui.QBrush:
-    c = QtGui.QColor(*base)
-    light = _lighter(c, 1.35)
-    grad = QtGui.QRadialGradient(QtCore.QPointF(0.35, 0.35), 0.9)
-    grad.setCoordinateMode(QtGui.QGradient.CoordinateMode.ObjectBoundingMode)
-    grad.setColorAt(0.0, light)
-    grad.setColorAt(0.55, c)
-    grad.setColorAt(1.0, QtGui.QColor(c.red() // 2, c.green() // 2, c.blue() // 2, c.alpha()))
-    return QtGui.QBrush(grad)
+class _TaskSignals(QtCore.QObject):
+    finished = QtCore.pyqtSignal(object)
+    failed = QtCore.pyqtSignal(str)
+
+
+class _Task(QtCore.QRunnable):
+    """Runs fn(*args) on the thread pool; the result comes back as a queued signal."""
+
+    def __init__(self, fn, *args):
+        super().__init__()
+        self.fn, self.args = fn, args
+        self.signals = _TaskSignals()
+
+    def run(self):
+        try:
+            result = self.fn(*self.args)
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+        else:
+            self.signals.finished.emit(result)
 
 
 class MainWindow(QtWidgets.QMainWindow):
     def __init__(self):
         super().__init__()
+        pg.setConfigOptions(antialias=True)
         self.setWindowTitle("Discrete Breather Init (DBI)")
         self.resize(1320, 880)
 
         self.dataset: Optional[DataSet] = None
+        # contiguous float32 copies of the x/y columns, scanned by every selection tool
+        self._x: Optional[np.ndarray] = None
+        self._y: Optional[np.ndarray] = None
+        self._scratch: Optional[np.ndarray] = None  # (2, n) float32 work rows for distance tests
+        self._mask_buf: Optional[np.ndarray] = None  # (n,) bool, filled by _in_circle
+        self._index: Optional[PointIndex] = None
+        self._index_ds: Optional[DataSet] = None
+        self._load_task: Optional[_Task] = None
         self.state: Optional[ProjectState] = None
         self.active_group_id: int = 0
         self.group_counter = 0
@@ -54,9 +74,14 @@ class MainWindow(QtWidgets.QMainWindow):
         self.mode = "select"  # 'select', 'rect', 'hline', 'vline'
         self.dragging_rect = False
         self.rect_origin_scene: Optional[QtCore.QPointF] = None
-        self.rect_item: Optional[QtWidgets.QGraphicsRectItem] = None
         self.line_item: Optional[QtWidgets.QGraphicsLineItem] = None
         self.line_pen = pg.mkPen((255, 255, 0, 180), width=1, style=QtCore.Qt.PenStyle.DashLine)
+        # overlay and outline pens are built once and shared by every redraw
+        self._rect_pen = pg.mkPen((255, 255, 0, 160), width=1, style=QtCore.Qt.PenStyle.DashLine)
+        self._box_pen = pg.mkPen(220, 220, 220, 160, width=1)
+        self._circle_pen = pg.mkPen((50, 200, 255, 160), width=2)
+        self._scatter_pen = pg.mkPen(40, 40, 40, 130, width=0.5)
+        self._no_pen = pg.mkPen(None)
 
         self.last_line_orientation: Optional[str] = None  # 'h' or 'v'
         self.last_line_indices: Optional[np.ndarray] = None
@@ -69,6 +94,26 @@ class MainWindow(QtWidgets.QMainWindow):
 
         self.use_shading = True
         self._brush_cache: Dict[Tuple[int, int, int, int], QtGui.QBrush] = {}
+        self._plain_brush_cache: Dict[Tuple[int, int, int, int], QtGui.QBrush] = {}
+        self._table_cache: Dict[Tuple[str, bool], Tuple[bytes, np.ndarray]] = {}
+        self._colors_sig: Optional[tuple] = None  # what the scatter brushes were last built from
+        # spin box steps only schedule a resize; one setSize runs per burst
+        self._applied_diam: Optional[float] = None
+        self._px_mode = False
+        self._size_timer = QtCore.QTimer(self)
+        self._size_timer.setSingleShot(True)
+        self._size_timer.setInterval(16)
+        self._size_timer.timeout.connect(self._apply_point_size)
+        self._size_clock = QtCore.QElapsedTimer()
+        self._size_clock.start()
+        # hover updates capped near 120 Hz; the last position is always applied
+        self._pending_move = None
+        self._move_timer = QtCore.QTimer(self)
+        self._move_timer.setSingleShot(True)
+        self._move_timer.setInterval(8)
+        self._move_timer.timeout.connect(self._apply_mouse_move)
+        self._move_clock = QtCore.QElapsedTimer()
+        self._move_clock.start()
 
         self._build_menu()
         self._build_quick_toolbar()
@@ -245,6 +290,8 @@ class MainWindow(QtWidgets.QMainWindow):
         self.plot.setBackground("k")
         self.plot.showGrid(x=True, y=True, alpha=0.15)
         self.plot.setAspectLocked(True)
+        # repaint only the bounding rect of what changed (label, drag overlays) instead of per-item regions
+        self.plot.setViewportUpdateMode(QtWidgets.QGraphicsView.ViewportUpdateMode.SmartViewportUpdate)
         self.viewbox = self.plot.getPlotItem().getViewBox()
         self.box_item: Optional[QtWidgets.QGraphicsRectItem] = None
 
@@ -253,9 +300,17 @@ class MainWindow(QtWidgets.QMainWindow):
             pxMode=False,
             symbol="o",
             brush=pg.mkBrush(*UNASSIGNED_RGBA),
-            pen=pg.mkPen(40, 40, 40, 130, width=0.5),
+            pen=self._scatter_pen,
         )
+        # pans reuse the rendered pixmap; setData/setBrush/setSize invalidate it via update()
+        self.scatter.setCacheMode(QtWidgets.QGraphicsItem.CacheMode.DeviceCoordinateCache)
         self.plot.addItem(self.scatter)
+        # one rubber band for every rect drag; shown and resized, never recreated
+        self.rect_item = QtWidgets.QGraphicsRectItem()
+        self.rect_item.setPen(self._rect_pen)
+        self.rect_item.setZValue(10)
+        self.rect_item.hide()
+        self.plot.addItem(self.rect_item, ignoreBounds=True)
         v.addWidget(self.plot)
 
         bottom = QtWidgets.QWidget()
@@ -274,6 +329,7 @@ class MainWindow(QtWidgets.QMainWindow):
 
         self.plot.scene().sigMouseMoved.connect(self.on_mouse_moved)
         self.plot.scene().sigMouseClicked.connect(self.on_mouse_clicked)
+        self.viewbox.sigRangeChanged.connect(self._on_view_range_changed)
 
     def _build_docks(self):
         # Single right-side dock with scrollable content
@@ -493,7 +549,7 @@ class MainWindow(QtWidgets.QMainWindow):
             self, "Open LAMMPS data file", "", "LAMMPS data (*.data *.dat *.*)"
         )
         if path:
-            self.load_datafile(path)
+            self.load_datafile_async(path)
 
     def on_open_project(self):
         path, _ = QtWidgets.QFileDialog.getOpenFileName(
@@ -543,8 +599,9 @@ class MainWindow(QtWidgets.QMainWindow):
         }
 
     def _apply_loaded_state(self, state: ProjectState, ui: Dict[str, Any]):
+        self._load_task = None  # supersedes a data file still being parsed
         self.state = state
-        self.dataset = state.data
+        self._set_dataset(state.data)
         self.group_counter = max(state.groups.keys(), default=0)
         self.group_list.clear()
         for gid in sorted(state.groups.keys()):
@@ -560,30 +617,30 @@ class MainWindow(QtWidgets.QMainWindow):
         elif self.group_list.count() > 0:
             self.group_list.setCurrentRow(0)
 
-        self.A.setValue(state.breather.A)
-        self.beta.setValue(state.breather.beta)
-        self.x0.setValue(state.breather.x0)
-        self.y0.setValue(state.breather.y0)
-
         self.circle_enabled = bool(ui.get("circle_enabled", False))
-        self.btn_circle.setChecked(self.circle_enabled)
         cc = ui.get("circle_center")
         self.circle_center = (float(cc[0]), float(cc[1])) if cc else None
         self.circle_radius = float(ui.get("circle_radius", 0.0))
-        self.radius_spin.setValue(self.circle_radius)
-
-        ps = int(ui.get("point_scale", 100))
-        self.point_scale_spin.blockSignals(True)
-        self.point_scale_spin.setValue(ps)
-        self.point_scale_spin.blockSignals(False)
         self.use_shading = bool(ui.get("use_shading", True))
-        self.chk_shading.setChecked(self.use_shading)
-        self.atom_radius_spin.setValue(float(ui.get("atom_radius", 0.0)))
-
+        self.atom_select_radius = float(ui.get("atom_radius", 0.0))
         self.state.apply_localizing = bool(ui.get("apply_localizing", True))
-        self.chk_apply_local.setChecked(self.state.apply_localizing)
         self.state.preserve_base_selection = bool(ui.get("preserve_base", True))
-        self.chk_preserve.setChecked(self.state.preserve_base_selection)
+
+        # the attributes above are already set, so the widget slots are skipped
+        # and _populate_scatter below does the one redraw
+        self._set_silent((
+            (self.A, state.breather.A),
+            (self.beta, state.breather.beta),
+            (self.x0, state.breather.x0),
+            (self.y0, state.breather.y0),
+            (self.btn_circle, self.circle_enabled),
+            (self.radius_spin, self.circle_radius),
+            (self.point_scale_spin, int(ui.get("point_scale", 100))),
+            (self.chk_shading, self.use_shading),
+            (self.atom_radius_spin, self.atom_select_radius),
+            (self.chk_apply_local, self.state.apply_localizing),
+            (self.chk_preserve, self.state.preserve_base_selection),
+        ))
 
         self._populate_scatter()
         self._draw_cell_outline()
@@ -596,12 +653,85 @@ class MainWindow(QtWidgets.QMainWindow):
 
         self.btn_select.setChecked(True)
         self._update_enabled(True)
-        self.update_scatter_colors()
         self._update_circle_item()
 
-    def load_datafile(self, path: str):
-        data = read_lammps_data(path)
+    def _set_silent(self, pairs):
+        for w, v in pairs:
+            w.blockSignals(True)
+            if isinstance(v, bool):
+                w.setChecked(v)
+            else:
+                w.setValue(v)
+            w.blockSignals(False)
+
+    def _set_dataset(self, data: DataSet):
         self.dataset = data
+        self._x = np.ascontiguousarray(data.x, dtype=np.float32)
+        self._y = np.ascontiguousarray(data.y, dtype=np.float32)
+        self._scratch = np.empty((2, self._x.size), dtype=np.float32)
+        self._mask_buf = np.empty(self._x.size, dtype=bool)
+
+    def load_datafile(self, path: str):
+        from ..core.lammps_parser import read_lammps_data
+        self._load_dataset(read_lammps_data(path), path)
+
+    def load_datafile_async(self, path: str):
+        """Parse the atoms on the thread pool and fill the window in when they arrive."""
+        from ..core.lammps_parser import read_lammps_header, read_lammps_atoms
+        try:
+            # cheap pass on the GUI thread: bad files fail before the worker starts
+            box, atoms_offset = read_lammps_header(path)
+        except (OSError, ValueError) as e:
+            QtWidgets.QMessageBox.warning(self, "Open data file", str(e))
+            return
+        # the previous file is detached for the whole load, so the `if not self.state`
+        # guards turn input away until new atoms (or, on failure, the old file) are back
+        prev_state, prev_data = self.state, self.dataset
+        self.state = self.dataset = None
+        self._update_enabled(False)
+        # the header already fixes the cell: show it while the atoms are parsed
+        self.scatter.clear()
+        self._draw_cell_outline(box)
+        self._fit_view(box)
+        progress = QtWidgets.QProgressDialog(f"Reading {Path(path).name}…", "", 0, 0, self)
+        progress.setCancelButton(None)
+        progress.setWindowModality(QtCore.Qt.WindowModality.WindowModal)
+        progress.setMinimumDuration(0)
+        progress.show()
+
+        # a sync load or project open in the meantime owns the window; drop late results
+        def done(data):
+            progress.close()
+            if self._load_task is not task:
+                return
+            self._load_task = None
+            self._load_dataset(data, path)
+
+        def failed(msg):
+            progress.close()
+            if self._load_task is not task:
+                return
+            self._load_task = None
+            self.state, self.dataset = prev_state, prev_data
+            if self.dataset is not None:  # put the previous file back on screen
+                self._populate_scatter()
+                self._fit_view()
+                self._draw_cell_outline()
+                self._update_enabled(True)
+            elif self.box_item is not None:
+                self.plot.removeItem(self.box_item)
+                self.box_item = None
+            QtWidgets.QMessageBox.warning(self, "Open data file", msg)
+
+        task = _Task(read_lammps_atoms, path, box, atoms_offset)
+        task.signals.finished.connect(done)
+        task.signals.failed.connect(failed)
+        self._load_task = task
+        QtCore.QThreadPool.globalInstance().start(task)
+
+    def _load_dataset(self, data: DataSet, path: str):
+        self._load_task = None  # supersedes a data file still being parsed
+        self._set_dataset(data)
         self.state = ProjectState(data)
         self.state.breather = BreatherParams(
             A=self.A.value(),
@@ -647,9 +777,7 @@ class MainWindow(QtWidgets.QMainWindow):
 
     def _add_group_item(self, g):
         item = QtWidgets.QListWidgetItem(g.name)
-        pix = QtGui.QPixmap(16, 16)
-        pix.fill(tuple_to_qcolor(g.color))
-        item.setIcon(QtGui.QIcon(pix))
+        item.setIcon(QtGui.QIcon(swatch_pixmap(g.color)))
         item.setData(QtCore.Qt.ItemDataRole.UserRole, g.gid)
         self.group_list.addItem(item)
 
@@ -673,18 +801,12 @@ class MainWindow(QtWidgets.QMainWindow):
         gid = int(item.data(QtCore.Qt.ItemDataRole.UserRole))
         self.active_group_id = gid
         g = self.state.groups[gid]
-        self.ux.blockSignals(True)
-        self.uy.blockSignals(True)
-        self.uz.blockSignals(True)
-        self.angle_spin.blockSignals(True)
-        self.ux.setValue(g.direction[0])
-        self.uy.setValue(g.direction[1])
-        self.uz.setValue(g.direction[2])
-        self.angle_spin.setValue(math.degrees(math.atan2(g.direction[1], g.direction[0])))
-        self.ux.blockSignals(False)
-        self.uy.blockSignals(False)
-        self.uz.blockSignals(False)
-        self.angle_spin.blockSignals(False)
+        self._set_silent((
+            (self.ux, g.direction[0]),
+            (self.uy, g.direction[1]),
+            (self.uz, g.direction[2]),
+            (self.angle_spin, g.angle_deg),
+        ))
 
     def on_change_color(self):
         item = self.group_list.currentItem()
@@ -697,16 +819,17 @@ class MainWindow(QtWidgets.QMainWindow):
         )
         if col.isValid():
             g.color = (col.red(), col.green(), col.blue(), 255)
-            pix = QtGui.QPixmap(16, 16)
-            pix.fill(col)
-            item.setIcon(QtGui.QIcon(pix))
+            self._brush_cache.clear()
+            self._plain_brush_cache.clear()
+            self._table_cache.clear()
+            item.setIcon(QtGui.QIcon(swatch_pixmap(g.color)))
             self.update_scatter_colors()
             self._log(f"Changed color of group {gid}.")
             self.is_dirty = True
 
     def on_angle_changed(self, ang_deg: float):
-        ux = math.cos(math.radians(ang_deg))
-        uy = math.sin(math.radians(ang_deg))
+        rad = math.radians(ang_deg)
+        ux, uy = math.cos(rad), math.sin(rad)
         self.ux.blockSignals(True)
         self.uy.blockSignals(True)
         self.ux.setValue(ux)
@@ -721,12 +844,9 @@ class MainWindow(QtWidgets.QMainWindow):
             return
         gid = int(item.data(QtCore.Qt.ItemDataRole.UserRole))
         g = self.state.groups[gid]
-        v = np.array(
-            [self.ux.value(), self.uy.value(), self.uz.value()], dtype=float
-        )
-        n = np.linalg.norm(v)
-        v = np.array([1.0, 0.0, 0.0]) if n == 0 else v / n
-        g.direction = (float(v[0]), float(v[1]), float(v[2]))
+        ux, uy, uz = self.ux.value(), self.uy.value(), self.uz.value()
+        n = math.hypot(ux, uy, uz)
+        g.direction = (1.0, 0.0, 0.0) if n == 0 else (ux / n, uy / n, uz / n)
         self._log(
             f"Direction of group {gid} = ({g.direction[0]:.6f}, {g.direction[1]:.6f}, {g.direction[2]:.6f})"
         )
@@ -749,8 +869,7 @@ class MainWindow(QtWidgets.QMainWindow):
             scale = max(1e-6, self.point_scale_spin.value() / 100.0)
             self.base_diam_data = new_diam / scale
 
-        # update scatter item size
-        self.scatter.setSize(self._current_diam())
+        self._size_timer.start()
         self.is_dirty = True
 
 
@@ -767,103 +886,178 @@ class MainWindow(QtWidgets.QMainWindow):
     def _populate_scatter(self):
         if not self.dataset:
             return
-        x = self.dataset.x
-        y = self.dataset.y
+        x = self._x
+        y = self._y
         self.base_diam_data = self._estimate_point_diameter()
         if self.atom_select_radius == 0.0:
             self.atom_select_radius = 0.5 * self.base_diam_data
             self.atom_radius_spin.setValue(self.atom_select_radius)
+        large = x.size > LARGE_SCATTER
+        # large scatters draw one cached symbol pixmap per spot (pxMode) and are
+        # resized to the data diameter whenever the zoom changes
+        self._px_mode = large
+        self._applied_diam = self._drawn_size()
         self.scatter.setData(
             x=x,
             y=y,
-            size=self._current_diam(),
-            pxMode=False,
+            size=self._applied_diam,
+            pxMode=large,
             symbol="o",
-            pen=pg.mkPen(40, 40, 40, 130, width=0.5),
+            antialias=not large,
+            pen=self._no_pen if large else self._scatter_pen,
+            # brushes go in with the geometry so the spots are only prepared once
+            brush=self._scatter_brushes(),
         )
-        self.update_scatter_colors()
+        self._colors_sig = self._colors_signature()
 
     def on_toggle_shading(self, checked: bool):
         self.use_shading = checked
         self.update_scatter_colors()
 
+    def _shaded_brush(self, base: Tuple[int, int, int, int]) -> QtGui.QBrush:
+        b = self._brush_cache.get(base)
+        if b is not None:
+            return b
+        c = QtGui.QColor(*base)
+        light = _lighter(c, 1.35)
+        grad = QtGui.QRadialGradient(QtCore.QPointF(0.35, 0.35), 0.9)
+        grad.setCoordinateMode(QtGui.QGradient.CoordinateMode.ObjectBoundingMode)
+        grad.setColorAt(0.0, light)
+        grad.setColorAt(0.55, c)
+        grad.setColorAt(1.0, QtGui.QColor(c.red() // 2, c.green() // 2, c.blue() // 2, c.alpha()))
+        b = self._brush_cache[base] = QtGui.QBrush(grad)
+        return b
+
+    def _plain_brush(self, rgba: Tuple[int, int, int, int]) -> QtGui.QBrush:
+        b = self._plain_brush_cache.get(rgba)
+        if b is None:
+            b = self._plain_brush_cache[rgba] = pg.mkBrush(*rgba)
+        return b
+
+    def _brush_table(self, make, dim: bool = False) -> np.ndarray:
+        """One brush per palette row, so brushes are built per group, not per atom.
+
+        With dim, a second block of flat, darkened rows follows the normal ones.
+        """
+        palette = self.state.color_palette(UNASSIGNED_RGBA)
+        # the table only changes with the palette; reuse it across recolors
+        key = palette.tobytes()
+        hit = self._table_cache.get((make.__name__, dim))
+        if hit is not None and hit[0] == key:
+            return hit[1]
+        colors = [make(tuple(c)) for c in palette.tolist()]
+        if dim:
+            dark = palette.copy()
+            dark[:, :3] = dark[:, :3].astype(np.uint16) * 2 // 5  # 40% brightness, integer math
+            colors += [self._plain_brush(tuple(c)) for c in dark.tolist()]
+        table = np.empty(len(colors), dtype=object)
+        table[:] = colors
+        self._table_cache[(make.__name__, dim)] = (key, table)
+        return table
+
     def update_scatter_colors(self):
         if not self.state:
             return
-        n = self.state.assignment.size
-        if self.use_shading:
-            base_brushes = []
-            for i in range(n):
-                gid = self.state.assignment[i]
-                key = UNASSIGNED_RGBA if gid == 0 else self.state.groups[gid].color
-                b = self._brush_cache.get(key)
-                if b is None:
-                    b = _make_shaded_brush(key)
-                    self._brush_cache[key] = b
-                base_brushes.append(b)
-            if self.circle_enabled and self.circle_center and self.circle_radius > 0.0:
-                x0, y0 = self.circle_center
-                R2 = self.circle_radius * self.circle_radius
-                dx = self.dataset.x - x0
-                dy = self.dataset.y - y0
-                inside = (dx * dx + dy * dy) <= R2
-                brushes = []
-                for i in range(n):
-                    if inside[i]:
-                        brushes.append(base_brushes[i])
-                    else:
-                        gid = self.state.assignment[i]
-                        col = (
-                            UNASSIGNED_RGBA
-                            if gid == 0
-                            else self.state.groups[gid].color
-                        )
-                        dim_col = (
-                            max(0, int(col[0] * 0.4)),
-                            max(0, int(col[1] * 0.4)),
-                            max(0, int(col[2] * 0.4)),
-                            255,
-                        )
-                        brushes.append(QtGui.QBrush(QtGui.QColor(*dim_col)))
-                self.scatter.setBrush(brushes)
-            else:
-                self.scatter.setBrush(base_brushes)
+        # colors only: x/y/size stay as pushed by _populate_scatter
+        sig = self._colors_signature()
+        if sig == self._colors_sig:
+            return
+        self.scatter.setBrush(self._scatter_brushes())
+        self._colors_sig = sig
+
+    def _colors_signature(self) -> tuple:
+        # incremental recolors leave this stale on purpose, so the next full update still runs
+        circle = (self.circle_center, self.circle_radius) if self._circle_active() else None
+        palette = self.state.color_palette(UNASSIGNED_RGBA)
+        return (id(self.state), self.state.version, palette.tobytes(), self.use_shading, circle,
+                len(self.scatter.data))
+
+    def _recolor_indices(self, idx):
+        """Refresh only the brushes of the given atoms, e.g. after an edit."""
+        data = self.scatter.data
+        if len(data) != self.state.assignment.size:
+            self.update_scatter_colors()
+            return
+        data["brush"][idx] = self._scatter_brushes(idx)
+        # pixel mode looks spots up in the symbol atlas again where sourceRect is cleared
+        data["sourceRect"][idx] = 0
+        self.scatter.updateSpots()
+
+    def _scatter_brushes(self, idx=slice(None)) -> np.ndarray:
+        make = self._shaded_brush if self.use_shading else self._plain_brush
+        n = len(self.state.color_palette(UNASSIGNED_RGBA))
+        rows = self.state.palette_rows(n, idx)
+        if self._circle_active():
+            # atoms outside the mask get the flat, darkened color of their group
+            table = self._brush_table(make, dim=True)
+            rows = rows + n * ~self._in_circle(idx)
         else:
-            rgba = self.state.colors_rgba_for_all(UNASSIGNED_RGBA)
-            if self.circle_enabled and self.circle_center and self.circle_radius > 0.0:
-                x0, y0 = self.circle_center
-                R2 = self.circle_radius * self.circle_radius
-                dx = self.dataset.x - x0
-                dy = self.dataset.y - y0
-                inside = (dx * dx + dy * dy) <= R2
-                out_rgba = rgba.copy()
-                out_rgba[~inside, :3] = (out_rgba[~inside, :3] * 0.4).astype(np.ubyte)
-                self.scatter.setBrush([
-                    pg.mkBrush(*out_rgba[i]) for i in range(n)
-                ])
-            else:
-                self.scatter.setBrush([
-                    pg.mkBrush(*rgba[i]) for i in range(n)
-                ])
+            table = self._brush_table(make)
+        return table[rows]
+
+    def _circle_active(self) -> bool:
+        return bool(self.circle_enabled and self.circle_center and self.circle_radius > 0.0)
+
+    def _in_circle(self, idx=slice(None)) -> np.ndarray:
+        """Inside-circle mask of the atoms at idx; the buffer is reused, so consume it before the next call."""
+        x0, y0 = self.circle_center
+        x, y = self._x[idx], self._y[idx]
+        k = x.size
+        # squared distances and the mask are built in per-dataset buffers, not in fresh temporaries
+        if k <= self._mask_buf.size:
+            (dx, dy), out = self._scratch[:, :k], self._mask_buf[:k]
+        else:  # overlapping rule strips can list an atom more than once
+            dx, dy, out = np.empty(k, dtype=np.float32), np.empty(k, dtype=np.float32), None
+        np.subtract(x, x0, out=dx)
+        dx *= dx
+        np.subtract(y, y0, out=dy)
+        dy *= dy
+        dx += dy
+        return np.less_equal(dx, self.circle_radius * self.circle_radius, out=out)
 
     def _on_point_scale_changed(self, _):
         if self.dataset is not None:
-            self.scatter.setSize(self._current_diam())
+            self._size_timer.start()
             self.is_dirty = True
 
-    def _fit_view(self):
-        b = self.dataset.box
+    def _apply_point_size(self):
+        if self.dataset is None:
+            return
+        d = self._drawn_size()
+        if d != self._applied_diam:
+            self.scatter.setSize(d)
+            self._applied_diam = d
+            self._size_clock.restart()
+
+    def _drawn_size(self) -> float:
+        d = self._current_diam()
+        if self._px_mode:
+            px = self.viewbox.viewPixelSize()[0]
+            d = max(1.0, d / px) if px > 0 else 1.0
+        return d
+
+    def _on_view_range_changed(self, *_):
+        if self._px_mode and self.dataset is not None:
+            # throttled rather than debounced, so spots keep up during a long zoom
+            if self._size_clock.elapsed() >= 16:
+                self._apply_point_size()
+            elif not self._size_timer.isActive():
+                self._size_timer.start()
+
+    def _fit_view(self, box: Optional[Box] = None):
+        b = box or self.dataset.box
         self.plot.setXRange(b.xlo, b.xhi, padding=0.03)
         self.plot.setYRange(b.ylo, b.yhi, padding=0.03)
 
-    def _draw_cell_outline(self):
+    def _draw_cell_outline(self, box: Optional[Box] = None):
         if self.box_item is not None:
             self.plot.removeItem(self.box_item)
             self.box_item = None
-        b = self.dataset.box
+        b = box or self.dataset.box
         rect = QtCore.QRectF(b.xlo, b.ylo, b.xhi - b.xlo, b.yhi - b.ylo)
         self.box_item = QtWidgets.QGraphicsRectItem(rect)
-        self.box_item.setPen(pg.mkPen(220, 220, 220, 160, width=1))
+        self.box_item.setPen(self._box_pen)
+        self.box_item.setCacheMode(QtWidgets.QGraphicsItem.CacheMode.DeviceCoordinateCache)
         self.plot.addItem(self.box_item)
 
     # ---------- Modes & mouse ----------
@@ -882,9 +1076,7 @@ class MainWindow(QtWidgets.QMainWindow):
         self._log(f"Mode: {m}")
 
     def _clear_rect_overlay(self):
-        if self.rect_item is not None:
-            self.plot.removeItem(self.rect_item)
-            self.rect_item = None
+        self.rect_item.hide()
         self.dragging_rect = False
         self.rect_origin_scene = None
 
@@ -900,6 +1092,17 @@ class MainWindow(QtWidgets.QMainWindow):
             self.line_item = None
 
     def on_mouse_moved(self, scene_pos):
+        self._pending_move = scene_pos
+        if self._move_clock.elapsed() >= 8:
+            self._apply_mouse_move()
+        elif not self._move_timer.isActive():
+            self._move_timer.start()
+
+    def _apply_mouse_move(self):
+        scene_pos, self._pending_move = self._pending_move, None
+        if scene_pos is None:
+            return
+        self._move_clock.restart()
         pt = self.viewbox.mapSceneToView(scene_pos)
         self.coord_label.setText(f"  x: {pt.x():.6f}    y: {pt.y():.6f}  ")
         if self.mode == "rect" and self.dragging_rect and self.rect_origin_scene is not None:
@@ -916,6 +1119,7 @@ class MainWindow(QtWidgets.QMainWindow):
     def on_mouse_clicked(self, ev):
         if not self.dataset:
             return
+        self._apply_mouse_move()  # the rubber band must match the click position
         btn = ev.button()
         pt = self.viewbox.mapSceneToView(ev.scenePos())
         x, y = pt.x(), pt.y()
@@ -928,12 +1132,7 @@ class MainWindow(QtWidgets.QMainWindow):
                     self._update_rect_item(self.rect_origin_scene, ev.scenePos())
                 else:
                     rect = self.rect_item.rect()
-                    idx = np.nonzero(
-                        (self.dataset.x >= rect.left())
-                        & (self.dataset.x <= rect.right())
-                        & (self.dataset.y >= rect.top())
-                        & (self.dataset.y <= rect.bottom())
-                    )[0]
+                    idx = self._point_index().rect(rect.left(), rect.right(), rect.top(), rect.bottom())
                     idx = self._apply_circle_constraint(idx)
                     if idx.size:
                         self._assign_indices(
@@ -941,6 +1140,7 @@ class MainWindow(QtWidgets.QMainWindow):
                             mode="add"
                             if self.state.preserve_base_selection
                             else "toggle",
+                            unique=True,
                         )
                     self._clear_rect_overlay()
                 return
@@ -960,45 +1160,43 @@ class MainWindow(QtWidgets.QMainWindow):
                 off = int(self.line_offset.value()) % N
 
                 if self.mode == "hline":
-                    dy = np.abs(self.dataset.y - y)
-                    idx = np.nonzero(dy <= R)[0]
+                    idx = self._point_index().strip(1, y, R)
                     idx = self._apply_circle_constraint(idx)
                     if idx.size == 0:
                         self._log("Horizontal line: 0 atoms hit.")
                         return
-                    order = np.argsort(self.dataset.x[idx])
+                    order = np.argsort(self._x[idx])
                     idx_sorted = idx[order]
-                    keep = np.arange(idx_sorted.size) % N == off
-                    hits = idx_sorted[keep]
+                    hits = stride_keep(idx_sorted, N, off)
                     self.last_line_orientation = "h"
                     self.last_line_indices = hits.copy()
                     self._assign_indices(
-                        hits,
+                        np.sort(hits),  # distinct already, only the order differs
                         mode="add"
                         if self.state.preserve_base_selection
                         else "toggle",
+                        unique=True,
                     )
                     self._log(
                         f"H-line @ y={y:.6f}: hit {idx.size}, kept {hits.size} (N={N}, off={off})."
                     )
                 else:
-                    dx = np.abs(self.dataset.x - x)
-                    idx = np.nonzero(dx <= R)[0]
+                    idx = self._point_index().strip(0, x, R)
                     idx = self._apply_circle_constraint(idx)
                     if idx.size == 0:
                         self._log("Vertical line: 0 atoms hit.")
                         return
-                    order = np.argsort(self.dataset.y[idx])
+                    order = np.argsort(self._y[idx])
                     idx_sorted = idx[order]
-                    keep = np.arange(idx_sorted.size) % N == off
-                    hits = idx_sorted[keep]
+                    hits = stride_keep(idx_sorted, N, off)
                     self.last_line_orientation = "v"
                     self.last_line_indices = hits.copy()
                     self._assign_indices(
-                        hits,
+                        np.sort(hits),  # distinct already, only the order differs
                         mode="add"
                         if self.state.preserve_base_selection
                         else "toggle",
+                        unique=True,
                     )
                     self._log(
                         f"V-line @ x={x:.6f}: hit {idx.size}, kept {hits.size} (N={N}, off={off})."
@@ -1009,35 +1207,24 @@ class MainWindow(QtWidgets.QMainWindow):
             idx = self._nearest_atom_index(x, y)
             if idx is None:
                 return
-            if self.circle_enabled and self.circle_center and self.circle_radius > 0.0:
-                cx, cy = self.circle_center
-                dx = self.dataset.x[idx] - cx
-                dy = self.dataset.y[idx] - cy
-                if dx * dx + dy * dy > self.circle_radius * self.circle_radius:
-                    return
+            if self._circle_active() and not self._in_circle(idx)[0]:
+                return
             if self.state.preserve_base_selection:
                 self._assign_indices(
                     np.array([idx], dtype=int),
                     mode="add" if self.state.assignment[idx] == 0 else "remove",
+                    unique=True,
                 )
             else:
-                self._assign_indices(np.array([idx], dtype=int), mode="toggle")
+                self._assign_indices(np.array([idx], dtype=int), mode="toggle", unique=True)
 
     def _update_rect_item(self, scene_p1, scene_p2):
         v1 = self.viewbox.mapSceneToView(scene_p1)
         v2 = self.viewbox.mapSceneToView(scene_p2)
         left, right = sorted([v1.x(), v2.x()])
         bottom, top = sorted([v1.y(), v2.y()])
-        rect = QtCore.QRectF(left, bottom, right - left, top - bottom)
-        if self.rect_item is None:
-            pen = pg.mkPen(
-                (255, 255, 0, 160), width=1, style=QtCore.Qt.PenStyle.DashLine
-            )
-            self.rect_item = QtWidgets.QGraphicsRectItem(rect)
-            self.rect_item.setPen(pen)
-            self.plot.addItem(self.rect_item)
-        else:
-            self.rect_item.setRect(rect)
+        self.rect_item.setRect(QtCore.QRectF(left, bottom, right - left, top - bottom))
+        self.rect_item.show()
 
     # ---------- Helpers ----------
     def _view_px_to_data_scale(self) -> Tuple[float, float]:
@@ -1051,26 +1238,27 @@ class MainWindow(QtWidgets.QMainWindow):
             return None
         sx, sy = self._view_px_to_data_scale()
         tol2 = (pixel_tol * sx) ** 2 + (pixel_tol * sy) ** 2
-        dx = self.dataset.x - x
-        dy = self.dataset.y - y
-        dist2 = dx * dx + dy * dy
-        idx = int(np.argmin(dist2))
-        return idx if dist2[idx] <= tol2 else None
+        return self._point_index().nearest(x, y, tol2)
+
+    def _point_index(self) -> PointIndex:
+        # built on first use after each (re)load
+        if self._index_ds is not self.dataset:
+            self._index = PointIndex(self._x, self._y)
+            self._index_ds = self.dataset
+        return self._index
 
     def _apply_circle_constraint(self, indices: np.ndarray) -> np.ndarray:
-        if not (self.circle_enabled and self.circle_center and self.circle_radius > 0.0):
+        if not self._circle_active():
             return indices
-        x0, y0 = self.circle_center
-        R = self.circle_radius
-        dx = self.dataset.x[indices] - x0
-        dy = self.dataset.y[indices] - y0
-        return indices[(dx * dx + dy * dy) <= R * R]
+        return indices[self._in_circle(indices)]
 
-    def _assign_indices(self, indices: np.ndarray, mode: str = "add"):
+    def _assign_indices(self, indices: np.ndarray, mode: str = "add", unique: bool = False):
+        """Apply mode to the atoms at indices; pass unique=True when they are already sorted and distinct."""
         if not self.state:
             return
         gid = self.active_group_id
-        indices = np.unique(indices)
+        if not unique:
+            indices = np.unique(indices)
         curr = self.state.assignment[indices]
 
         if mode == "remove":
@@ -1084,7 +1272,8 @@ class MainWindow(QtWidgets.QMainWindow):
                     "Please select or create a group first.",
                 )
                 return
-            new = np.where(curr == gid, 0, gid)
+            new = np.full_like(curr, gid)
+            new[curr == gid] = 0
             desc = f"toggle {len(indices)} to group {gid}"
         elif mode == "add":
             if gid == 0:
@@ -1094,24 +1283,20 @@ class MainWindow(QtWidgets.QMainWindow):
                     "Please select or create a group first.",
                 )
                 return
-            new = np.where(curr == gid, curr, gid)
+            new = np.full_like(curr, gid)  # atoms already in gid keep it; Edit.make drops them
             desc = f"add {len(indices)} to group {gid}"
         else:
             return
 
-        before = curr.copy()
-        after = new.copy()
-        self.state.assignment[indices] = after
+        self.state.set_assignment(indices, new)
         self.state.undo_stack.append(
-            Edit(indices=indices, before=before, after=after, description=desc)
+            Edit.make(indices=indices, before=curr, after=new, description=desc)
         )
-        if len(self.state.undo_stack) > self.state.max_history:
-            self.state.undo_stack.pop(0)
         self.state.redo_stack.clear()
 
-        ids = [int(self.dataset.ids[i]) for i in indices]
-        self._log(f"{desc}; e.g. {ids[:10]}{'...' if len(ids) > 10 else ''}")
-        self.update_scatter_colors()
+        preview = self.dataset.ids[indices[:10]].tolist()
+        self._log(f"{desc}; e.g. {preview}{'...' if indices.size > 10 else ''}")
+        self._recolor_indices(indices)
         self._refresh_undo_redo_actions()
         self.is_dirty = True
 
@@ -1119,6 +1304,7 @@ class MainWindow(QtWidgets.QMainWindow):
     def on_open_localizer(self):
         if not self.state:
             return
+        from .localize_dialog import LocalizeDialog
         dlg = LocalizeDialog(
             self.A.value(),
             self.beta.value(),
@@ -1246,13 +1432,13 @@ class MainWindow(QtWidgets.QMainWindow):
         if self.circle_item is not None:
             self.plot.removeItem(self.circle_item)
             self.circle_item = None
-        if self.circle_enabled and self.circle_center and self.circle_radius > 0.0:
+        if self._circle_active():
             x0, y0 = self.circle_center
             R = self.circle_radius
             rect = QtCore.QRectF(x0 - R, y0 - R, 2 * R, 2 * R)
-            pen = pg.mkPen((50, 200, 255, 160), width=2)
             self.circle_item = QtWidgets.QGraphicsEllipseItem(rect)
-            self.circle_item.setPen(pen)
+            self.circle_item.setPen(self._circle_pen)
+            self.circle_item.setCacheMode(QtWidgets.QGraphicsItem.CacheMode.DeviceCoordinateCache)
             self.plot.addItem(self.circle_item)
 
     # ---------- Rule tool ----------
@@ -1294,13 +1480,11 @@ class MainWindow(QtWidgets.QMainWindow):
 
         line_idx = self.last_line_indices
         if self.last_line_orientation == "h":
-            order = np.argsort(self.dataset.x[line_idx])
+            order = np.argsort(self._x[line_idx])
         else:
-            order = np.argsort(self.dataset.y[line_idx])
+            order = np.argsort(self._y[line_idx])
         line_idx_sorted = line_idx[order]
-        anchors = line_idx_sorted[
-            np.arange(line_idx_sorted.size) % max(1, N) == (Off % max(1, N))
-        ]
+        anchors = stride_keep(line_idx_sorted, N, Off)
         if anchors.size == 0:
             self._log("Rule: no anchors after row stride/offset.")
             return
@@ -1312,32 +1496,14 @@ class MainWindow(QtWidgets.QMainWindow):
             R = 0.5 * self.base_diam_data
             self.atom_radius_spin.setValue(R)
 
-        final = []
-        if self.last_line_orientation == "h":
-            for i in anchors:
-                xi = self.dataset.x[i]
-                dx = np.abs(self.dataset.x - xi)
-                idx = np.nonzero(dx <= R)[0]
-                idx = self._apply_circle_constraint(idx)
-                order = np.argsort(self.dataset.y[idx])
-                idx_sorted = idx[order]
-                keep = np.arange(idx_sorted.size) % max(1, M) == (Off2 % max(1, M))
-                final.extend(idx_sorted[keep].tolist())
-        else:
-            for i in anchors:
-                yi = self.dataset.y[i]
-                dy = np.abs(self.dataset.y - yi)
-                idx = np.nonzero(dy <= R)[0]
-                idx = self._apply_circle_constraint(idx)
-                order = np.argsort(self.dataset.x[idx])
-                idx_sorted = idx[order]
-                keep = np.arange(idx_sorted.size) % max(1, M) == (Off2 % max(1, M))
-                final.extend(idx_sorted[keep].tolist())
-
-        if not final:
+        # "h" lines are rows, so the rule propagates down columns (strips in x), and vice versa
+        axis = 0 if self.last_line_orientation == "h" else 1
+        final = rule_hits(self._point_index(), anchors, axis, R, M, Off2,
+                          inside=self._in_circle if self._circle_active() else None)
+        if final.size == 0:
             self._log("Rule: 0 atoms after perpendicular propagation.")
             return
-        self._assign_indices(np.array(sorted(set(final)), dtype=int), mode="add")
+        self._assign_indices(final, mode="add", unique=True)
 
     # ---------- Undo/Redo ----------
     def on_undo(self):
@@ -1346,7 +1512,7 @@ class MainWindow(QtWidgets.QMainWindow):
         e = self.state.undo()
         if e:
             self._log(f"Undo: {e.description}")
-            self.update_scatter_colors()
+            self._recolor_indices(e.indices)
             self.is_dirty = True
         self._refresh_undo_redo_actions()
 
@@ -1356,7 +1522,7 @@ class MainWindow(QtWidgets.QMainWindow):
         e = self.state.redo()
         if e:
             self._log(f"Redo: {e.description}")
-            self.update_scatter_colors()
+            self._recolor_indices(e.indices)
             self.is_dirty = True
         self._refresh_undo_redo_actions()
 